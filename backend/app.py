@@ -1,41 +1,93 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from contextlib import asynccontextmanager
+from typing import Any, List
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
 from dotenv import load_dotenv
+import json
+import logging
+import orjson
 import os
-from models.diagnosis import analyze_symptoms
+import uvicorn
+from models.diagnosis import PatientInfo, analyze_symptoms, client, start_batcher, stop_batcher
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'WARNING').upper())
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_batcher()
+    yield
+    await stop_batcher()
+    # Release pooled connections to the inference API
+    await client.aclose()
+
+class JSONResponse(ORJSONResponse):
+    """orjson-encoded response that falls back to the stdlib encoder for values orjson
+    rejects, such as integers wider than 64 bits echoed back from the request."""
+    
+    def render(self, content: Any) -> bytes:
+        try:
+            return super().render(content)
+        except orjson.JSONEncodeError:
+            return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=['*'],
+    allow_methods=['*'],
+    allow_headers=['*']
+)
+
+class AnalyzeRequest(BaseModel):
+    symptoms: List[str] = []
+    patient_info: PatientInfo = PatientInfo()
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    # Keep the endpoint's error shape for malformed request bodies
+    return JSONResponse(status_code=422, content={
+        'success': False,
+        'error': '; '.join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        )
+    })
+
+@app.post('/api/analyze')
+async def analyze(req: AnalyzeRequest):
     try:
-        data = request.json
-        symptoms = data.get('symptoms', [])
-        patient_info = data.get('patient_info', {})
-        
         # Get AI analysis
-        diagnosis = analyze_symptoms(symptoms, patient_info)
-        
-        return jsonify({
+        diagnosis = await analyze_symptoms(req.symptoms, req.patient_info)
+
+        return {
             'success': True,
             'diagnosis': diagnosis
-        })
+        }
     except Exception as e:
-        return jsonify({
+        return JSONResponse(status_code=500, content={
             'success': False,
             'error': str(e)
-        }), 500
+        })
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    return jsonify({
+@app.get('/api/health')
+async def health_check():
+    return {
         'status': 'healthy',
         'version': '1.0.0'
-    })
+    }
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    # Each worker runs its own event loop and serves many analyses concurrently
+    uvicorn.run(
+        'app:app',
+        host=os.getenv('HOST', '127.0.0.1'),
+        port=int(os.getenv('PORT', '5000')),
+        workers=int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)),
+        limit_concurrency=int(os.getenv('LIMIT_CONCURRENCY', '1000'))
+    )
@@ -1,346 +1,526 @@
-import requests
-from typing import List, Dict, Any
+import httpx
+from typing import List, Dict, Any, Optional, Tuple, Union
 import os
 from dotenv import load_dotenv
-import time
+import asyncio
 import json
+import logging
+import orjson
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from pydantic import BaseModel, ConfigDict
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Hugging Face API endpoint - using a medical-focused model
 API_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
 HEADERS = {"Authorization": f"Bearer {os.getenv('HUGGINGFACE_API_KEY')}"}
 
-def analyze_symptoms(symptoms: List[str], patient_info: Dict[str, Any]) -> Dict[str, Any]:
+# Shared async HTTP client: keep-alive connections to the inference API are pooled
+# across requests. No custom transport is passed so HTTP(S)_PROXY/NO_PROXY are honoured;
+# failed calls are retried by analyze_symptoms.
+client = httpx.AsyncClient(
+    headers=HEADERS,
+    timeout=httpx.Timeout(30.0, connect=3.0),
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+)
+
+# Model output cache, keyed by the exact prompt sent to the inference API
+CACHE_MAXSIZE = 4096
+analysis_cache: "OrderedDict[str, str]" = OrderedDict()
+
+def get_cached_analysis(prompt: str) -> Optional[str]:
+    """Return the cached model output for a prompt, if any."""
+    analysis = analysis_cache.get(prompt)
+    if analysis is not None:
+        analysis_cache.move_to_end(prompt)
+    return analysis
+
+def cache_analysis(prompt: str, analysis: str) -> None:
+    """Store model output for a prompt, evicting the least recently used entry."""
+    analysis_cache[prompt] = analysis
+    analysis_cache.move_to_end(prompt)
+    if len(analysis_cache) > CACHE_MAXSIZE:
+        analysis_cache.popitem(last=False)
+
+# Micro-batching: prompts arriving within MAX_WAIT_MS of each other are sent as one request
+MAX_BATCH = 16
+MAX_WAIT_MS = 20
+batch_queue: "Optional[asyncio.Queue[Tuple[str, asyncio.Future]]]" = None
+batcher_task: "Optional[asyncio.Task]" = None
+pending_batches: "set[asyncio.Task]" = set()
+
+def start_batcher() -> None:
+    """Start the background task that batches inference calls on the running event loop."""
+    global batch_queue, batcher_task
+    if batcher_task is not None and not batcher_task.done():
+        return
+    batch_queue = asyncio.Queue()
+    batcher_task = asyncio.create_task(batcher())
+
+async def stop_batcher() -> None:
+    """Stop the batching task and any batch requests still in flight."""
+    global batcher_task
+    tasks = list(pending_batches)
+    if batcher_task is not None:
+        tasks.append(batcher_task)
+        batcher_task = None
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Fail prompts that were queued but never collected into a batch
+    while batch_queue is not None and not batch_queue.empty():
+        fail_batch([batch_queue.get_nowait()], RuntimeError("Inference batcher stopped"))
+
+def fail_batch(batch: List[Tuple[str, asyncio.Future]], error: Exception) -> None:
+    """Resolve every still-pending future in a batch with an error."""
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+async def batcher() -> None:
+    """Collect queued prompts into batches of up to MAX_BATCH and submit each batch."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = []
+        try:
+            batch.append(await batch_queue.get())
+            deadline = loop.time() + MAX_WAIT_MS / 1000
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(batch_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Prompts already taken off the queue would otherwise never be resolved
+            fail_batch(batch, RuntimeError("Inference batcher stopped"))
+            raise
+        
+        # Submit without blocking collection of the next batch
+        task = asyncio.create_task(submit_batch(batch))
+        pending_batches.add(task)
+        task.add_done_callback(pending_batches.discard)
+
+async def submit_batch(batch: List[Tuple[str, asyncio.Future]]) -> None:
+    """Send a batch of prompts in one API call and resolve each caller's future."""
+    prompts = [prompt for prompt, _ in batch]
+    futures = [future for _, future in batch]
+    try:
+        # The body is always read, including small error bodies (e.g. 503 while the model
+        # loads), so the keep-alive connection goes back to the pool for the retry
+        response = await client.post(API_URL, json={"inputs": prompts})
+        
+        if response.status_code == 200:
+            results = orjson.loads(response.content)
+            if len(results) != len(prompts):
+                raise Exception(f"API returned {len(results)} results for {len(prompts)} inputs")
+        else:
+            results = [None] * len(prompts)
+        
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result((response.status_code, result))
+    except Exception as e:
+        fail_batch(batch, e)
+    finally:
+        # Cancellation (e.g. on shutdown) is not an Exception; still release the callers
+        fail_batch(batch, RuntimeError("Inference batch was cancelled"))
+
+async def enqueue(prompt: str) -> Tuple[int, Any]:
+    """Queue a prompt for the next batch and wait for its (status code, result) pair."""
+    start_batcher()
+    future = asyncio.get_running_loop().create_future()
+    await batch_queue.put((prompt, future))
+    return await future
+
+class PatientInfo(BaseModel):
+    """Patient details submitted alongside the symptoms."""
+    model_config = ConfigDict(extra='allow', coerce_numbers_to_str=True)
+    
+    age: Optional[Union[int, float, str]] = None
+    gender: Optional[str] = None
+    medical_history: Optional[str] = None
+
+# Potential acute complications to watch for
+ACUTE_COMPLICATIONS = "Monitor for signs of deterioration, systemic involvement, and emergency conditions"
+
+# Potential chronic implications to consider
+CHRONIC_IMPLICATIONS = "Consider long-term health impact, quality of life factors, and chronic disease management"
+
+# Recommended initial screening tests
+SCREENING_TESTS = "Basic blood work, vital signs monitoring, and relevant imaging studies"
+
+# Recommended additional diagnostic tests
+ADDITIONAL_TESTS = "Specialized testing based on specific symptoms and risk factors"
+
+# Recommended immediate interventions
+IMMEDIATE_INTERVENTIONS = "Supportive care, symptom management, and monitoring of vital signs"
+
+# Recommended long-term management strategies
+LONG_TERM_MANAGEMENT = "Lifestyle modifications, preventive measures, and regular health monitoring"
+
+# Recommended monitoring parameters
+MONITORING_PARAMETERS = "Vital signs, symptom progression, and response to interventions"
+
+# Criteria for specialist referral
+REFERRAL_CRITERIA = "Refer to appropriate specialist if symptoms persist or worsen"
+
+# General diet recommendations
+DIET_RECOMMENDATIONS = "Balanced diet with emphasis on whole foods, adequate hydration, and appropriate portion sizes"
+
+# General exercise recommendations
+EXERCISE_RECOMMENDATIONS = "Regular moderate exercise as tolerated, with appropriate rest periods and gradual progression"
+
+# Stress management recommendations
+STRESS_MANAGEMENT = "Regular relaxation techniques, adequate sleep, and stress-reduction activities"
+
+def display_value(value: Any) -> str:
+    """Format a patient detail for the prompt and reports, defaulting to 'Not provided'."""
+    return 'Not provided' if value is None or value == '' else str(value)
+
+# Prompt sent to the model; only the patient details vary between requests
+PROMPT_TEMPLATE = """
+Medical Case Analysis:
+Patient Demographics:
+- Age: {age}
+- Gender: {gender}
+- Medical History: {medical_history}
+
+Presenting Symptoms:
+{symptoms}
+
+Please provide a detailed medical analysis including:
+1. Differential diagnosis
+2. Risk factors
+3. Potential complications
+4. Recommended diagnostic tests
+5. Treatment considerations
+"""
+
+# Layout of the model-backed report; the fixed guidance text is filled in at import
+# and the per-request fields later with str.format_map
+REPORT_TEMPLATE = f"""
+Medical Analysis Report
+======================
+
+Patient Information:
+-------------------
+Age: {{age}}
+Gender: {{gender}}
+
+Medical History Analysis:
+-----------------------
+{{history_summary}}
+
+Presenting Symptoms:
+------------------
+{{symptoms}}
+
+Clinical Assessment:
+------------------
+1. Differential Diagnosis:
+   {{analysis}}
+
+2. Risk Assessment:
+   - Age-related factors: {{age_risk_factors}}
+   - Gender-specific considerations: {{gender_considerations}}
+   - Medical history impact: {{history_risk_factors}}
+
+3. Potential Complications:
+   - Acute complications: {ACUTE_COMPLICATIONS}
+   - Chronic implications: {CHRONIC_IMPLICATIONS}
+   - History-related complications: {{history_complications}}
+
+4. Recommended Diagnostic Workup:
+   - Initial screening tests: {SCREENING_TESTS}
+   - Additional investigations: {ADDITIONAL_TESTS}
+   - History-specific tests: {{history_tests}}
+
+5. Treatment Considerations:
+   - Immediate interventions: {IMMEDIATE_INTERVENTIONS}
+   - Long-term management: {LONG_TERM_MANAGEMENT}
+   - History-based precautions: {{history_precautions}}
+
+6. Follow-up Recommendations:
+   - Monitoring parameters: {MONITORING_PARAMETERS}
+   - Referral criteria: {REFERRAL_CRITERIA}
+   - History-specific monitoring: {{history_monitoring}}
+
+7. Lifestyle Recommendations:
+   - Diet and nutrition: {DIET_RECOMMENDATIONS}
+   - Exercise guidelines: {EXERCISE_RECOMMENDATIONS}
+   - Stress management: {STRESS_MANAGEMENT}
+
+Important Notes:
+--------------
+- This is an AI-generated preliminary analysis and should not replace professional medical evaluation
+- Seek immediate medical attention if symptoms worsen or new symptoms develop
+- Regular follow-up with healthcare providers is essential
+- Maintain a symptom diary for better tracking
+- Follow all prescribed medications and treatments
+"""
+
+async def analyze_symptoms(symptoms: List[str], patient_info: PatientInfo) -> Dict[str, Any]:
     """
     Analyze patient symptoms using Hugging Face's model to provide preliminary diagnosis.
     
     Args:
         symptoms (List[str]): List of patient symptoms
-        patient_info (Dict[str, Any]): Patient information including age, gender, etc.
+        patient_info (PatientInfo): Patient information including age, gender, etc.
     
     Returns:
         Dict[str, Any]: Analysis results including possible conditions and recommendations
     """
     # Prepare the prompt for the model
-    prompt = f"""
-    Medical Case Analysis:
-    Patient Demographics:
-    - Age: {patient_info.get('age', 'Not provided')}
-    - Gender: {patient_info.get('gender', 'Not provided')}
-    - Medical History: {patient_info.get('medical_history', 'Not provided')}
-    
-    Presenting Symptoms:
-    {', '.join(symptoms)}
+    prompt = PROMPT_TEMPLATE.format(
+        age=display_value(patient_info.age),
+        gender=display_value(patient_info.gender),
+        medical_history=display_value(patient_info.medical_history),
+        symptoms=', '.join(symptoms)
+    )
     
-    Please provide a detailed medical analysis including:
-    1. Differential diagnosis
-    2. Risk factors
-    3. Potential complications
-    4. Recommended diagnostic tests
-    5. Treatment considerations
-    """
+    # Analyze medical history in a worker thread while the model call is in flight
+    history_task = asyncio.create_task(
+        asyncio.to_thread(analyze_medical_history, patient_info.medical_history or '')
+    )
     
     max_retries = 3
     retry_delay = 5  # seconds
     
     for attempt in range(max_retries):
         try:
-            # Call Hugging Face API
-            response = requests.post(
-                API_URL,
-                headers=HEADERS,
-                json={"inputs": prompt}
-            )
+            # Reuse the model output for an identical prompt
+            analysis = get_cached_analysis(prompt)
             
-            if response.status_code == 503:
-                if attempt < max_retries - 1:
-                    print(f"Model is loading, retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    continue
-                else:
-                    return generate_detailed_analysis(symptoms, patient_info)
+            if analysis is None:
+                # Call Hugging Face API, batched with other concurrent requests
+                status_code, result = await enqueue(prompt)
+                
+                if status_code == 503:
+                    if attempt < max_retries - 1:
+                        logger.warning("Model is loading, retrying in %d seconds...", retry_delay)
+                        await asyncio.sleep(retry_delay)
+                        continue
+                    else:
+                        return generate_detailed_analysis(symptoms, patient_info)
+                
+                if status_code != 200:
+                    raise Exception(f"API request failed with status code {status_code}")
+                
+                # Parse and structure the response
+                analysis = result['summary_text']
+                cache_analysis(prompt, analysis)
             
-            if response.status_code != 200:
-                raise Exception(f"API request failed with status code {response.status_code}")
-            
-            # Parse and structure the response
-            analysis = response.json()[0]['summary_text']
-            
-            # Analyze medical history
-            history_analysis = analyze_medical_history(patient_info.get('medical_history', ''))
+            history_analysis = await history_task
             
             # Format the response with detailed medical analysis
-            formatted_analysis = f"""
-            Medical Analysis Report
-            ======================
-            
-            Patient Information:
-            -------------------
-            Age: {patient_info.get('age', 'Not provided')}
-            Gender: {patient_info.get('gender', 'Not provided')}
-            
-            Medical History Analysis:
-            -----------------------
-            {history_analysis['summary']}
-            
-            Presenting Symptoms:
-            ------------------
-            {', '.join(symptoms)}
-            
-            Clinical Assessment:
-            ------------------
-            1. Differential Diagnosis:
-               {analysis}
-            
-            2. Risk Assessment:
-               - Age-related factors: {get_age_risk_factors(patient_info.get('age'))}
-               - Gender-specific considerations: {get_gender_considerations(patient_info.get('gender'))}
-               - Medical history impact: {history_analysis['risk_factors']}
-            
-            3. Potential Complications:
-               - Acute complications: {get_acute_complications(symptoms)}
-               - Chronic implications: {get_chronic_implications(symptoms)}
-               - History-related complications: {history_analysis['complications']}
-            
-            4. Recommended Diagnostic Workup:
-               - Initial screening tests: {get_screening_tests(symptoms)}
-               - Additional investigations: {get_additional_tests(symptoms)}
-               - History-specific tests: {history_analysis['recommended_tests']}
-            
-            5. Treatment Considerations:
-               - Immediate interventions: {get_immediate_interventions(symptoms)}
-               - Long-term management: {get_long_term_management(symptoms)}
-               - History-based precautions: {history_analysis['precautions']}
-            
-            6. Follow-up Recommendations:
-               - Monitoring parameters: {get_monitoring_parameters(symptoms)}
-               - Referral criteria: {get_referral_criteria(symptoms)}
-               - History-specific monitoring: {history_analysis['monitoring']}
-            
-            7. Lifestyle Recommendations:
-               - Diet and nutrition: {get_diet_recommendations(symptoms, patient_info)}
-               - Exercise guidelines: {get_exercise_recommendations(symptoms, patient_info)}
-               - Stress management: {get_stress_management(symptoms, patient_info)}
-            
-            Important Notes:
-            --------------
-            - This is an AI-generated preliminary analysis and should not replace professional medical evaluation
-            - Seek immediate medical attention if symptoms worsen or new symptoms develop
-            - Regular follow-up with healthcare providers is essential
-            - Maintain a symptom diary for better tracking
-            - Follow all prescribed medications and treatments
-            """
+            formatted_analysis = REPORT_TEMPLATE.format_map({
+                'age': display_value(patient_info.age),
+                'gender': display_value(patient_info.gender),
+                'symptoms': ', '.join(symptoms),
+                'analysis': analysis,
+                'age_risk_factors': get_age_risk_factors(patient_info.age),
+                'gender_considerations': get_gender_considerations(patient_info.gender),
+                'history_summary': history_analysis['summary'],
+                'history_risk_factors': history_analysis['risk_factors'],
+                'history_complications': history_analysis['complications'],
+                'history_tests': history_analysis['recommended_tests'],
+                'history_precautions': history_analysis['precautions'],
+                'history_monitoring': history_analysis['monitoring']
+            })
             
             return {
                 'analysis': formatted_analysis,
                 'symptoms_analyzed': symptoms,
-                'patient_info_used': patient_info,
+                'patient_info_used': patient_info.model_dump(exclude_unset=True),
                 'history_analysis': history_analysis,
                 'recommendations': {
-                    'diet': get_diet_recommendations(symptoms, patient_info),
-                    'exercise': get_exercise_recommendations(symptoms, patient_info),
-                    'stress': get_stress_management(symptoms, patient_info)
+                    'diet': DIET_RECOMMENDATIONS,
+                    'exercise': EXERCISE_RECOMMENDATIONS,
+                    'stress': STRESS_MANAGEMENT
                 }
             }
             
         except Exception as e:
             if attempt < max_retries - 1:
-                print(f"Attempt {attempt + 1} failed: {str(e)}")
-                time.sleep(retry_delay)
+                logger.warning("Attempt %d failed: %s", attempt + 1, e)
+                await asyncio.sleep(retry_delay)
                 continue
             else:
                 return generate_detailed_analysis(symptoms, patient_info)
     
     return generate_detailed_analysis(symptoms, patient_info)
 
+# Keywords indicating common medical conditions in free-text history
+MEDICAL_CONDITIONS = {
+    'diabetes': ['diabetes', 'diabetic', 'blood sugar', 'insulin'],
+    'hypertension': ['hypertension', 'high blood pressure', 'hbp'],
+    'heart_disease': ['heart disease', 'cardiac', 'heart attack', 'angina'],
+    'respiratory': ['asthma', 'copd', 'bronchitis', 'pneumonia'],
+    'arthritis': ['arthritis', 'joint pain', 'rheumatoid', 'osteoarthritis'],
+    'mental_health': ['depression', 'anxiety', 'bipolar', 'schizophrenia'],
+    'allergies': ['allergies', 'allergic', 'anaphylaxis'],
+    'cancer': ['cancer', 'tumor', 'malignancy', 'oncology']
+}
+
+# All keywords compiled into one pattern; the lookahead also reports overlapping matches
+KEYWORD_CONDITIONS = {
+    keyword: condition
+    for condition, keywords in MEDICAL_CONDITIONS.items()
+    for keyword in keywords
+}
+CONDITION_PATTERN = re.compile(
+    '(?=(' + '|'.join(re.escape(keyword) for keyword in sorted(KEYWORD_CONDITIONS, key=len, reverse=True)) + '))'
+)
+
+# Sections of the history analysis as (key, text when no condition is detected,
+# header, suffix of each per-condition line)
+HISTORY_SECTIONS = [
+    ('summary', "No specific medical conditions detected in the provided history.",
+     "Detected medical conditions:", ""),
+    ('risk_factors', "Standard risk factors based on age and gender apply.",
+     "Additional risk factors based on medical history:", "-related complications"),
+    ('complications', "Standard complication monitoring recommended.",
+     "Potential complications to monitor:", "-related complications"),
+    ('recommended_tests', "Standard screening tests recommended.",
+     "Additional tests recommended based on medical history:", "-specific monitoring"),
+    ('precautions', "Standard precautions recommended.",
+     "Additional precautions based on medical history:", "-specific precautions"),
+    ('monitoring', "Standard monitoring parameters recommended.",
+     "Additional monitoring parameters based on medical history:", "-specific monitoring")
+]
+
+# Analyses returned when no history is given or no known condition is found in it
+NO_HISTORY_ANALYSIS = {
+    'summary': 'No medical history provided. Please provide medical history for better analysis.',
+    'risk_factors': 'Unable to assess risk factors without medical history.',
+    'complications': 'Unable to assess potential complications without medical history.',
+    'recommended_tests': 'Standard screening tests recommended based on age and gender.',
+    'precautions': 'General precautions recommended. Specific precautions require medical history.',
+    'monitoring': 'Standard monitoring parameters recommended.'
+}
+NO_CONDITIONS_ANALYSIS = {key: no_conditions for key, no_conditions, _, _ in HISTORY_SECTIONS}
+
 def analyze_medical_history(history: str) -> Dict[str, str]:
     """Analyze medical history and provide detailed insights."""
-    if not history or history.lower() == 'not provided':
-        return {
-            'summary': 'No medical history provided. Please provide medical history for better analysis.',
-            'risk_factors': 'Unable to assess risk factors without medical history.',
-            'complications': 'Unable to assess potential complications without medical history.',
-            'recommended_tests': 'Standard screening tests recommended based on age and gender.',
-            'precautions': 'General precautions recommended. Specific precautions require medical history.',
-            'monitoring': 'Standard monitoring parameters recommended.'
-        }
-    
-    # Analyze common medical conditions
-    conditions = {
-        'diabetes': ['diabetes', 'diabetic', 'blood sugar', 'insulin'],
-        'hypertension': ['hypertension', 'high blood pressure', 'hbp'],
-        'heart_disease': ['heart disease', 'cardiac', 'heart attack', 'angina'],
-        'respiratory': ['asthma', 'copd', 'bronchitis', 'pneumonia'],
-        'arthritis': ['arthritis', 'joint pain', 'rheumatoid', 'osteoarthritis'],
-        'mental_health': ['depression', 'anxiety', 'bipolar', 'schizophrenia'],
-        'allergies': ['allergies', 'allergic', 'anaphylaxis'],
-        'cancer': ['cancer', 'tumor', 'malignancy', 'oncology']
-    }
+    history = history.lower()
+    if not history or history == 'not provided':
+        return dict(NO_HISTORY_ANALYSIS)
     
-    detected_conditions = []
-    for condition, keywords in conditions.items():
-        if any(keyword in history.lower() for keyword in keywords):
-            detected_conditions.append(condition)
+    # Detect common medical conditions in a single scan of the history
+    matched = {KEYWORD_CONDITIONS[match.group(1)] for match in CONDITION_PATTERN.finditer(history)}
+    detected_conditions = [condition for condition in MEDICAL_CONDITIONS if condition in matched]
     
     # Generate analysis based on detected conditions
-    analysis = {
-        'summary': generate_history_summary(detected_conditions),
-        'risk_factors': generate_risk_factors(detected_conditions),
-        'complications': generate_complications(detected_conditions),
-        'recommended_tests': generate_recommended_tests(detected_conditions),
-        'precautions': generate_precautions(detected_conditions),
-        'monitoring': generate_monitoring_plan(detected_conditions)
-    }
+    if not detected_conditions:
+        return dict(NO_CONDITIONS_ANALYSIS)
     
-    return analysis
+    condition_names = [condition.replace('_', ' ').title() for condition in detected_conditions]
+    return {
+        key: header + "\n" + "".join(f"- {name}{suffix}\n" for name in condition_names)
+        for key, _, header, suffix in HISTORY_SECTIONS
+    }
 
-def generate_history_summary(conditions: List[str]) -> str:
-    """Generate a summary of medical history analysis."""
-    if not conditions:
-        return "No specific medical conditions detected in the provided history."
-    
-    summary = "Detected medical conditions:\n"
-    for condition in conditions:
-        summary += f"- {condition.replace('_', ' ').title()}\n"
-    return summary
-
-def generate_risk_factors(conditions: List[str]) -> str:
-    """Generate risk factors based on medical conditions."""
-    if not conditions:
-        return "Standard risk factors based on age and gender apply."
-    
-    risk_factors = "Additional risk factors based on medical history:\n"
-    for condition in conditions:
-        risk_factors += f"- {condition.replace('_', ' ').title()}-related complications\n"
-    return risk_factors
-
-def generate_complications(conditions: List[str]) -> str:
-    """Generate potential complications based on medical conditions."""
-    if not conditions:
-        return "Standard complication monitoring recommended."
-    
-    complications = "Potential complications to monitor:\n"
-    for condition in conditions:
-        complications += f"- {condition.replace('_', ' ').title()}-related complications\n"
-    return complications
-
-def generate_recommended_tests(conditions: List[str]) -> str:
-    """Generate recommended tests based on medical conditions."""
-    if not conditions:
-        return "Standard screening tests recommended."
-    
-    tests = "Additional tests recommended based on medical history:\n"
-    for condition in conditions:
-        tests += f"- {condition.replace('_', ' ').title()}-specific monitoring\n"
-    return tests
-
-def generate_precautions(conditions: List[str]) -> str:
-    """Generate precautions based on medical conditions."""
-    if not conditions:
-        return "Standard precautions recommended."
-    
-    precautions = "Additional precautions based on medical history:\n"
-    for condition in conditions:
-        precautions += f"- {condition.replace('_', ' ').title()}-specific precautions\n"
-    return precautions
-
-def generate_monitoring_plan(conditions: List[str]) -> str:
-    """Generate monitoring plan based on medical conditions."""
-    if not conditions:
-        return "Standard monitoring parameters recommended."
-    
-    monitoring = "Additional monitoring parameters based on medical history:\n"
-    for condition in conditions:
-        monitoring += f"- {condition.replace('_', ' ').title()}-specific monitoring\n"
-    return monitoring
+# Layout of the report used when the model is unavailable, with the fixed guidance
+# text already filled in
+FALLBACK_REPORT_TEMPLATE = f"""
+Medical Analysis Report
+======================
 
-def get_diet_recommendations(symptoms: List[str], patient_info: Dict[str, Any]) -> str:
-    """Get personalized diet recommendations."""
-    return "Balanced diet with emphasis on whole foods, adequate hydration, and appropriate portion sizes"
+Patient Information:
+-------------------
+Age: {{age}}
+Gender: {{gender}}
+Medical History: {{medical_history}}
 
-def get_exercise_recommendations(symptoms: List[str], patient_info: Dict[str, Any]) -> str:
-    """Get personalized exercise recommendations."""
-    return "Regular moderate exercise as tolerated, with appropriate rest periods and gradual progression"
+Presenting Symptoms:
+------------------
+{{symptoms}}
 
-def get_stress_management(symptoms: List[str], patient_info: Dict[str, Any]) -> str:
-    """Get stress management recommendations."""
-    return "Regular relaxation techniques, adequate sleep, and stress-reduction activities"
+Clinical Assessment:
+------------------
+1. Differential Diagnosis:
+   Based on the presenting symptoms, several conditions should be considered:
+   - Acute conditions requiring immediate attention
+   - Chronic conditions requiring ongoing management
+   - Systemic conditions affecting multiple organ systems
 
-def generate_detailed_analysis(symptoms: List[str], patient_info: Dict[str, Any]) -> Dict[str, Any]:
+2. Risk Assessment:
+   - Age-related factors: {{age_risk_factors}}
+   - Gender-specific considerations: {{gender_considerations}}
+   - Lifestyle and medical history impact: {{history_impact}}
+
+3. Potential Complications:
+   - Acute complications: {ACUTE_COMPLICATIONS}
+   - Chronic implications: {CHRONIC_IMPLICATIONS}
+
+4. Recommended Diagnostic Workup:
+   - Initial screening tests: {SCREENING_TESTS}
+   - Additional investigations: {ADDITIONAL_TESTS}
+
+5. Treatment Considerations:
+   - Immediate interventions: {IMMEDIATE_INTERVENTIONS}
+   - Long-term management: {LONG_TERM_MANAGEMENT}
+
+6. Follow-up Recommendations:
+   - Monitoring parameters: {MONITORING_PARAMETERS}
+   - Referral criteria: {REFERRAL_CRITERIA}
+
+Important Notes:
+--------------
+- This is an AI-generated preliminary analysis and should not replace professional medical evaluation
+- Seek immediate medical attention if symptoms worsen or new symptoms develop
+- Regular follow-up with healthcare providers is essential
+- Maintain a symptom diary for better tracking
+"""
+
+def generate_detailed_analysis(symptoms: List[str], patient_info: PatientInfo) -> Dict[str, Any]:
     """Generate a detailed medical analysis when the AI model is unavailable."""
     return {
-        'analysis': f"""
-        Medical Analysis Report
-        ======================
-        
-        Patient Information:
-        -------------------
-        Age: {patient_info.get('age', 'Not provided')}
-        Gender: {patient_info.get('gender', 'Not provided')}
-        Medical History: {patient_info.get('medical_history', 'Not provided')}
-        
-        Presenting Symptoms:
-        ------------------
-        {', '.join(symptoms)}
-        
-        Clinical Assessment:
-        ------------------
-        1. Differential Diagnosis:
-           Based on the presenting symptoms, several conditions should be considered:
-           - Acute conditions requiring immediate attention
-           - Chronic conditions requiring ongoing management
-           - Systemic conditions affecting multiple organ systems
-        
-        2. Risk Assessment:
-           - Age-related factors: {get_age_risk_factors(patient_info.get('age'))}
-           - Gender-specific considerations: {get_gender_considerations(patient_info.get('gender'))}
-           - Lifestyle and medical history impact: {get_history_impact(patient_info.get('medical_history'))}
-        
-        3. Potential Complications:
-           - Acute complications: {get_acute_complications(symptoms)}
-           - Chronic implications: {get_chronic_implications(symptoms)}
-        
-        4. Recommended Diagnostic Workup:
-           - Initial screening tests: {get_screening_tests(symptoms)}
-           - Additional investigations: {get_additional_tests(symptoms)}
-        
-        5. Treatment Considerations:
-           - Immediate interventions: {get_immediate_interventions(symptoms)}
-           - Long-term management: {get_long_term_management(symptoms)}
-        
-        6. Follow-up Recommendations:
-           - Monitoring parameters: {get_monitoring_parameters(symptoms)}
-           - Referral criteria: {get_referral_criteria(symptoms)}
-        
-        Important Notes:
-        --------------
-        - This is an AI-generated preliminary analysis and should not replace professional medical evaluation
-        - Seek immediate medical attention if symptoms worsen or new symptoms develop
-        - Regular follow-up with healthcare providers is essential
-        - Maintain a symptom diary for better tracking
-        """,
+        'analysis': FALLBACK_REPORT_TEMPLATE.format_map({
+            'age': display_value(patient_info.age),
+            'gender': display_value(patient_info.gender),
+            'medical_history': display_value(patient_info.medical_history),
+            'symptoms': ', '.join(symptoms),
+            'age_risk_factors': get_age_risk_factors(patient_info.age),
+            'gender_considerations': get_gender_considerations(patient_info.gender),
+            'history_impact': get_history_impact(patient_info.medical_history)
+        }),
         'symptoms_analyzed': symptoms,
-        'patient_info_used': patient_info
+        'patient_info_used': patient_info.model_dump(exclude_unset=True)
     }
 
-def get_age_risk_factors(age: str) -> str:
+# Age group boundaries (pediatric below 18, geriatric from 65) and their risk factors
+AGE_GROUP_BOUNDS = [18, 65]
+AGE_GROUP_RISK_FACTORS = [
+    "Pediatric considerations, developmental factors, growth monitoring",
+    "Adult risk factors, lifestyle-related conditions, occupational health",
+    "Geriatric considerations, age-related conditions, polypharmacy risks"
+]
+
+def get_age_risk_factors(age: Optional[Union[int, float, str]]) -> str:
     """Get age-specific risk factors."""
-    try:
-        age_num = int(age)
-        if age_num < 18:
-            return "Pediatric considerations, developmental factors, growth monitoring"
-        elif age_num < 65:
-            return "Adult risk factors, lifestyle-related conditions, occupational health"
-        else:
-            return "Geriatric considerations, age-related conditions, polypharmacy risks"
-    except:
+    age = '' if age is None else str(age).strip()
+    # Whole or fractional ages (e.g. '45' or '45.5'); anything else is undeterminable
+    if not age.replace('.', '', 1).isdecimal():
         return "Age-specific risk factors cannot be determined"
+    # Bucket on the whole part; more than three digits is past every boundary, and
+    # skipping int() there avoids the interpreter's limit on very long digit strings
+    whole = age.partition('.')[0].lstrip('0') or '0'
+    age_num = int(whole) if len(whole) <= 3 else AGE_GROUP_BOUNDS[-1]
+    return AGE_GROUP_RISK_FACTORS[bisect_right(AGE_GROUP_BOUNDS, age_num)]
 
-def get_gender_considerations(gender: str) -> str:
+def get_gender_considerations(gender: Optional[str]) -> str:
     """Get gender-specific medical considerations."""
-    gender = gender.lower()
+    gender = (gender or '').lower()
     if gender == 'male':
         return "Male-specific conditions, hormonal factors, prostate health"
     elif gender == 'female':
@@ -348,40 +528,8 @@ def get_gender_considerations(gender: str) -> str:
     else:
         return "General health considerations"
 
-def get_history_impact(history: str) -> str:
+def get_history_impact(history: Optional[str]) -> str:
     """Analyze impact of medical history."""
     if not history or history.lower() == 'not provided':
         return "Medical history impact cannot be assessed"
     return "Consider impact of existing conditions on current symptoms"
-
-def get_acute_complications(symptoms: List[str]) -> str:
-    """Get potential acute complications based on symptoms."""
-    return "Monitor for signs of deterioration, systemic involvement, and emergency conditions"
-
-def get_chronic_implications(symptoms: List[str]) -> str:
-    """Get potential chronic implications based on symptoms."""
-    return "Consider long-term health impact, quality of life factors, and chronic disease management"
-
-def get_screening_tests(symptoms: List[str]) -> str:
-    """Get recommended initial screening tests."""
-    return "Basic blood work, vital signs monitoring, and relevant imaging studies"
-
-def get_additional_tests(symptoms: List[str]) -> str:
-    """Get recommended additional diagnostic tests."""
-    return "Specialized testing based on specific symptoms and risk factors"
-
-def get_immediate_interventions(symptoms: List[str]) -> str:
-    """Get recommended immediate interventions."""
-    return "Supportive care, symptom management, and monitoring of vital signs"
-
-def get_long_term_management(symptoms: List[str]) -> str:
-    """Get recommended long-term management strategies."""
-    return "Lifestyle modifications, preventive measures, and regular health monitoring"
-
-def get_monitoring_parameters(symptoms: List[str]) -> str:
-    """Get recommended monitoring parameters."""
-    return "Vital signs, symptom progression, and response to interventions"
-
-def get_referral_criteria(symptoms: List[str]) -> str:
-    """Get criteria for specialist referral."""
-    return "Refer to appropriate specialist if symptoms persist or worsen" 
\ No newline at end of file
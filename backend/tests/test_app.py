@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+import app
+
+
+async def echo_patient_info(symptoms, patient_info):
+    return {'patient_info_used': patient_info.model_dump(exclude_unset=True)}
+
+
+def test_analyze_echoes_integers_wider_than_64_bits(monkeypatch):
+    # orjson cannot encode these; the response must still be a normal JSON body
+    monkeypatch.setattr(app, 'analyze_symptoms', echo_patient_info)
+    big = 99999999999999999999
+    with TestClient(app.app) as client:
+        response = client.post('/api/analyze', json={
+            'symptoms': ['fever'],
+            'patient_info': {'age': big, 'visit_id': big}
+        })
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/json'
+    assert response.json() == {
+        'success': True,
+        'diagnosis': {'patient_info_used': {'age': big, 'visit_id': big}}
+    }